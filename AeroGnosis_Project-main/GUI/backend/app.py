@@ -1,11 +1,21 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
 from fastapi import FastAPI, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pathlib import Path
 from PIL import Image
+import cv2
+import onnxruntime as ort
 import torch
-import torchvision.transforms as T
+from torchvision.io import ImageReadMode, decode_image
+from torchvision.transforms import v2
+import asyncio
+import hashlib
 import io
+import os
+import threading
 import traceback
 import base64
 import numpy as np
@@ -14,7 +24,18 @@ from crack_model import create_model  # UNet++ factory
 
 # --------- FASTAPI APP ---------
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The batcher's queue and worker task must live on the server's event loop
+    await batcher.start()
+    yield
+    await batcher.stop()
+    for pool in (preprocess_pool, inference_pool, postprocess_pool):
+        pool.shutdown(wait=False)
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,11 +47,91 @@ app.add_middleware(
 
 # --------- MODEL CONFIG ---------
 
-device = torch.device("cpu")  # CPU inference
+# CUDA runs the eager model under FP16 autocast; CPU runs the ONNX session
+device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 NUM_CLASSES = 2               # Background + Crack
 
+# Split the cores between uvicorn workers (WEB_CONCURRENCY is uvicorn's worker
+# count) so concurrent processes don't oversubscribe and thrash each other's caches
+WORKERS = max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+NUM_THREADS = max(1, (os.cpu_count() or 1) // WORKERS)
+torch.backends.mkldnn.enabled = True
+
+# /predict is a three-stage pipeline (preprocess -> batched inference ->
+# postprocess). Each stage has its own pool so different requests' stages
+# overlap instead of queueing behind each other.
+STAGE_WORKERS = 2
+preprocess_pool = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix="preprocess")
+inference_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+postprocess_pool = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix="postprocess")
+
+# Core budget for this process: torch only runs the light pre/postprocess ops
+# (its thread count is process-wide, so it is set once here), one core per
+# stage worker; ONNX Runtime inference gets the remaining cores.
+torch.set_num_threads(1)
+INFERENCE_THREADS = max(1, NUM_THREADS - 2 * STAGE_WORKERS)
+
 BASE_DIR = Path(__file__).resolve().parent
 MODEL_PATH = BASE_DIR / "model" / "model.pth"  # backend/model/model.pth
+ONNX_PATH = BASE_DIR / "model" / "model.onnx"  # exported from MODEL_PATH on startup
+INT8_PATH = BASE_DIR / "model" / "model.int8.onnx"  # built when calibration images exist
+CALIBRATION_DIR = BASE_DIR / "model" / "calibration"  # sample crack images for INT8
+INPUT_SIZE = 512
+MAX_BATCH = 8               # max concurrent requests fused into one forward
+MAX_BATCH_WAIT_S = 0.005    # how long the first request waits for company
+CUDA_BATCH_BUCKETS = (1, 2, 4, MAX_BATCH)  # compiled CUDA batch sizes; batches pad up
+PREDICTION_CACHE_SIZE = 128 # recent results kept, keyed by SHA-256 of the upload
+MAX_IN_FLIGHT = 4 * MAX_BATCH  # requests admitted into the pipeline; the rest wait
+
+# Preprocessing: match training/eval (512x512 + ImageNet normalization).
+# Tensor-first torchvision v2 resize; the uint8 result is also reused for the overlay.
+resize = v2.Compose([
+    v2.ToImage(),
+    v2.Resize((INPUT_SIZE, INPUT_SIZE), antialias=True),
+])
+
+# ToTensor (x / 255) followed by Normalize ((x - mean) / std) folded into a
+# single multiply-add: y = x * 1 / (255 * std) - mean / std
+IMAGENET_MEAN = torch.tensor([0.485, 0.456, 0.406])
+IMAGENET_STD = torch.tensor([0.229, 0.224, 0.225])
+NORM_SCALE = (1.0 / (255.0 * IMAGENET_STD)).view(3, 1, 1)
+NORM_BIAS = (-IMAGENET_MEAN / IMAGENET_STD).view(3, 1, 1)
+
+
+def to_tensor_and_normalize(image: torch.Tensor) -> torch.Tensor:
+    """
+    Convert a uint8 [3, H, W] image to a normalized float32 tensor in two
+    passes: a uint8 -> float32 cast, then one in-place fused multiply-add.
+    """
+    out = image.to(torch.float32)
+    return torch.addcmul(NORM_BIAS, out, NORM_SCALE, out=out)
+
+
+def transform(image) -> torch.Tensor:
+    """Full preprocessing of a PIL image or uint8 tensor to [3, 512, 512]."""
+    return to_tensor_and_normalize(resize(image))
+
+
+def decode_upload(contents: bytes) -> torch.Tensor:
+    """Decode uploaded image bytes into a uint8 [3, H, W] RGB tensor."""
+    try:
+        data = torch.frombuffer(bytearray(contents), dtype=torch.uint8)
+        return decode_image(data, mode=ImageReadMode.RGB)
+    except RuntimeError:
+        # Formats torchvision cannot decode natively (BMP, WebP, ...) go via PIL
+        return v2.functional.pil_to_tensor(Image.open(io.BytesIO(contents)).convert("RGB"))
+
+
+def preprocess(contents: bytes):
+    """
+    Decode, resize and normalize an upload. Returns the resized image as a
+    uint8 [512, 512, 3] array (for the overlay) and the [1, 3, 512, 512]
+    model input.
+    """
+    image = resize(decode_upload(contents))
+    img_np = image.permute(1, 2, 0).numpy()
+    tensor = to_tensor_and_normalize(image).unsqueeze(0)
+    return img_np, tensor
 
 
 def load_model():
@@ -74,78 +175,329 @@ def load_model():
         raise e
 
 
-model = load_model()
+@contextmanager
+def atomic_path(path: Path):
+    """
+    Yield a process-unique temp path next to `path` and move it onto `path`
+    once the block succeeds. Several uvicorn workers may export at startup;
+    none of them ever sees another's half-written file.
+    """
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp{path.suffix}")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
 
-# Preprocessing: match training/eval (512x512 + ImageNet normalization)
-transform = T.Compose([
-    T.Resize((512, 512)),
-    T.ToTensor(),
-    T.Normalize(
-        mean=[0.485, 0.456, 0.406],
-        std=[0.229, 0.224, 0.225],
-    ),
-])
 
+def has_dynamic_batch(onnx_path) -> bool:
+    """True if the ONNX graph's input batch axis is symbolic, not a fixed size."""
+    import onnx
 
-# --------- ROUTES ---------
+    graph = onnx.load(str(onnx_path), load_external_data=False).graph
+    return bool(graph.input[0].type.tensor_type.shape.dim[0].dim_param)
 
 
-@app.get("/health")
-async def health():
-    return {"status": "ok"}
+def export_onnx(model):
+    """
+    Export the loaded model to ONNX at ONNX_PATH with a fixed
+    [N, 3, 512, 512] input (dynamic batch N for request batching). The
+    export is cached and only redone when the checkpoint is newer than
+    the existing ONNX file or the cached graph has a static batch axis.
+    """
+    if (
+        ONNX_PATH.exists()
+        and ONNX_PATH.stat().st_mtime >= MODEL_PATH.stat().st_mtime
+        and has_dynamic_batch(ONNX_PATH)
+    ):
+        print(f"Using cached ONNX model: {ONNX_PATH}")
+        return ONNX_PATH
+
+    print(f"Exporting ONNX model to: {ONNX_PATH}")
+    dummy = torch.randn(1, 3, INPUT_SIZE, INPUT_SIZE, device=device)
+    with torch.no_grad(), atomic_path(ONNX_PATH) as tmp_path:
+        torch.onnx.export(
+            model,
+            dummy,
+            str(tmp_path),
+            opset_version=17,
+            input_names=["x"],
+            output_names=["logits"],
+            # only the batch axis is dynamic; static H/W lets ORT specialize
+            dynamic_axes={"x": {0: "batch"}, "logits": {0: "batch"}},
+        )
+    return ONNX_PATH
 
-@app.post("/predict")
-async def predict(file: UploadFile = File(...)):
+
+def create_session(onnx_path):
     """
-    Run UNet++ crack segmentation on the uploaded image.
+    Create an ONNX Runtime CPU session with full graph optimizations
+    (Conv-BN-ReLU fusion, constant folding).
+    """
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = INFERENCE_THREADS
+    return ort.InferenceSession(
+        str(onnx_path),
+        sess_options=options,
+        providers=["CPUExecutionProvider"],
+    )
 
-    Returns:
-        - success: bool
-        - file_name: str
-        - output_info: list (shape of the logits tensor)
+
+def prepare_onnx_model(model):
+    """
+    Export the model to ONNX and, if CALIBRATION_DIR holds sample images,
+    quantize it to INT8 (cached like the FP32 export). Returns the path of
+    the ONNX file to serve.
     """
+    onnx_path = export_onnx(model)
+
+    images = []
+    if CALIBRATION_DIR.is_dir():
+        images = sorted(
+            p for p in CALIBRATION_DIR.iterdir()
+            if p.suffix.lower() in {".jpg", ".jpeg", ".png"}
+        )
+    if not images:
+        return onnx_path
+
+    # Re-quantize when the FP32 export or any calibration image is newer
+    newest_input = max([onnx_path.stat().st_mtime] + [p.stat().st_mtime for p in images])
+    if INT8_PATH.exists() and INT8_PATH.stat().st_mtime >= newest_input:
+        print(f"Using cached INT8 model: {INT8_PATH}")
+        return INT8_PATH
+
+    # Imported lazily: onnxruntime.quantization pulls in onnx
+    from int8_quantization import quantize_int8
+
+    print(f"Quantizing to INT8 with {len(images)} calibration images")
+    inputs = [
+        transform(Image.open(p).convert("RGB")).unsqueeze(0).numpy()
+        for p in images
+    ]
+    with atomic_path(INT8_PATH) as tmp_path:
+        quantize_int8(onnx_path, tmp_path, inputs)
+    return INT8_PATH
+
+
+model = load_model()
+if device.type == "cpu":
+    session = create_session(prepare_onnx_model(model))
+else:
+    # Batches are padded up to one of CUDA_BATCH_BUCKETS, so the compiled
+    # model only sees a few static shapes: CUDA graphs + fused kernels per bucket
+    session = None
+    model = model.to(memory_format=torch.channels_last)
+    eager_model = model
     try:
-        # 1) Read uploaded file and open as RGB image
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents)).convert("RGB")
+        model = torch.compile(model, mode="reduce-overhead", dynamic=False)
+    except Exception as e:
+        print("torch.compile unavailable, using the eager model:", repr(e))
+
+if session is not None:
+    # Persistent ONNX Runtime input buffer sized for the largest batch; each run
+    # binds a leading slice, so the hot path allocates no new input buffer.
+    # Only safe because inference_pool has a single worker. Outputs get a fresh
+    # buffer per batch since postprocessing may still hold the previous one.
+    input_buf = np.empty((MAX_BATCH, 3, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+    input_buf_t = torch.from_numpy(input_buf)
+    io_binding = session.io_binding()
+
 
-        # 2) Preprocess to tensor [1, 3, 512, 512]
-        tensor = transform(image).unsqueeze(0).to(device)
+def run_model(tensors: list) -> torch.Tensor:
+    """
+    Run a list of [1, 3, H, W] tensors as one batch and return FP32
+    [N, NUM_CLASSES, H, W] logits on the CPU.
+    On CUDA the eager model runs under FP16 autocast; logits are cast back
+    to FP32 so the softmax stays in full precision.
+    """
+    if session is None:
+        n = len(tensors)
+        # Pad to the smallest compiled bucket so a new batch size never
+        # triggers a recompile or CUDA graph recording on a live request
+        if model is eager_model:
+            size = n
+        else:
+            size = next(b for b in CUDA_BATCH_BUCKETS if b >= n)
+        batch = torch.zeros(size, 3, INPUT_SIZE, INPUT_SIZE)
+        torch.cat(tensors, out=batch[:n])
+        batch = batch.to(device, memory_format=torch.channels_last)
+        with torch.inference_mode(), torch.autocast(device_type="cuda", dtype=torch.float16):
+            logits = model(batch)
+        return logits[:n].float().cpu()
+
+    n = len(tensors)
+    torch.cat(tensors, out=input_buf_t[:n])  # written straight into the bound input
+    io_binding.bind_cpu_input("x", input_buf[:n])
+    # ORT writes the logits straight into this array; no copy on the way out
+    out = np.empty((n, NUM_CLASSES, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+    io_binding.bind_output("logits", "cpu", 0, np.float32, out.shape, out.ctypes.data)
+    session.run_with_iobinding(io_binding)
+    return torch.from_numpy(out)
+
+
+def warm_up(runs: int = 2):
+    """
+    Push dummy inputs through the model so compilation, kernel selection and
+    memory arenas are settled before the first real request. On CUDA every
+    batch bucket is warmed so each compiled shape is recorded up front.
+    """
+    sizes = CUDA_BATCH_BUCKETS if session is None else (1,)
+    dummy = torch.zeros(1, 3, INPUT_SIZE, INPUT_SIZE)
+    for size in sizes:
+        for _ in range(runs):
+            # Serving runs on the inference thread, and CUDA graphs are per thread
+            inference_pool.submit(run_model, [dummy] * size).result()
+
+
+try:
+    warm_up()
+except Exception as e:
+    # Compilation happens lazily on the first call; without a working
+    # Inductor/Triton backend, keep serving with the eager model instead
+    if session is not None or model is eager_model:
+        raise
+    print("Compiled model failed, falling back to the eager model:", repr(e))
+    model = eager_model
+    warm_up()
+
+
+class InferenceBatcher:
+    """
+    Collects preprocessed tensors from concurrent /predict calls and runs
+    them through the model as a single batch. The first queued request waits
+    at most max_wait seconds for others to join, up to max_batch in total.
+    """
 
-        # 3) Inference
-        with torch.no_grad():
-            logits = model(tensor)  # [1, NUM_CLASSES, H, W]
-            probs = torch.softmax(logits, dim=1)
+    def __init__(self, max_batch: int = MAX_BATCH, max_wait: float = MAX_BATCH_WAIT_S):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = None
+        self._worker = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def infer(self, tensor: torch.Tensor) -> torch.Tensor:
+        """Queue a [1, 3, H, W] tensor and wait for its [1, NUM_CLASSES, H, W] logits."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((tensor, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        items = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(items) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return items
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._collect()
+            tensors = [tensor for tensor, _ in items]
+            try:
+                # Off the event loop so new requests keep queueing meanwhile
+                logits = await loop.run_in_executor(inference_pool, run_model, tensors)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for i, (_, future) in enumerate(items):
+                if not future.done():
+                    future.set_result(logits[i:i + 1])
+
+
+batcher = InferenceBatcher()
+pipeline_slots = asyncio.Semaphore(MAX_IN_FLIGHT)
+
+
+# Overlay blend: 50% red over the image. With constant colour and alpha the
+# blended value of each channel depends only on the input byte, so use LUTs.
+OVERLAY_ALPHA = 0.5
+_levels = np.arange(256, dtype=np.float64)
+RED_BLEND_LUT = (OVERLAY_ALPHA * 255 + (1 - OVERLAY_ALPHA) * _levels).astype(np.uint8)
+GB_BLEND_LUT = ((1 - OVERLAY_ALPHA) * _levels).astype(np.uint8)
+OVERLAY_JPEG_QUALITY = 85
+
+# Per-thread overlay buffers, reused across requests instead of a fresh copy each time
+_overlay_buffers = threading.local()
+
+
+def overlay_buffer() -> np.ndarray:
+    """Return this thread's reusable uint8 [512, 512, 3] overlay buffer."""
+    buf = getattr(_overlay_buffers, "bgr", None)
+    if buf is None:
+        buf = _overlay_buffers.bgr = np.empty((INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8)
+    return buf
+
+
+def postprocess(img_np: np.ndarray, logits: torch.Tensor) -> dict:
+    """
+    Turn [1, NUM_CLASSES, H, W] logits into the /predict payload: coverage and
+    confidence statistics, severity, crack quantification and the base64
+    JPEG overlay on top of the resized image.
+    """
+    with torch.inference_mode():
+        probs = torch.softmax(logits, dim=1)
 
         crack_probs = probs[:, 1, :, :]  # [1, H, W]
-        crack_mask = (crack_probs >= 0.5).float()
+        crack_mask = crack_probs >= 0.5
 
         height = int(crack_mask.shape[-2])
         width = int(crack_mask.shape[-1])
-        crack_pixels = float(crack_mask.sum().item())
-        total_pixels = float(height * width)
-        crack_coverage_pct = (crack_pixels / total_pixels) * 100.0 if total_pixels else 0.0
+        crack_pixels_t = crack_mask.sum().float()
+        crack_coverage_t = crack_pixels_t * (100.0 / (height * width))
 
-        crack_pixels_probs = crack_probs[crack_mask == 1]
+        crack_pixels_probs = crack_probs[crack_mask]
         if crack_pixels_probs.numel() > 0:
-            avg_confidence = float(crack_pixels_probs.mean().item())
-        else:
-            avg_confidence = 0.0
-        max_confidence = float(crack_probs.max().item())
-
-        if crack_coverage_pct < 0.5:
-            severity = "None / Very Low"
-        elif crack_coverage_pct < 2.0:
-            severity = "Low"
-        elif crack_coverage_pct < 5.0:
-            severity = "Medium"
+            avg_confidence_t = crack_pixels_probs.mean()
         else:
-            severity = "High"
-
-        # Prepare overlay image
-        image_resized = image.resize((512, 512))
-        img_np = np.array(image_resized.convert("RGB"), dtype=np.uint8)
-        crack_mask_np = crack_mask.squeeze(0).cpu().numpy().astype("uint8")
+            avg_confidence_t = crack_probs.new_zeros(())
+
+        # Single conversion to Python floats for all summary statistics
+        crack_pixels, crack_coverage_pct, avg_confidence, max_confidence = torch.stack(
+            [crack_pixels_t, crack_coverage_t, avg_confidence_t, crack_probs.max()]
+        ).tolist()
+
+    if crack_coverage_pct < 0.5:
+        severity = "None / Very Low"
+    elif crack_coverage_pct < 2.0:
+        severity = "Low"
+    elif crack_coverage_pct < 5.0:
+        severity = "Medium"
+    else:
+        severity = "High"
+
+    # Copy straight into BGR order (what cv2 encodes) to skip a cvtColor pass
+    overlay = overlay_buffer()
+    np.copyto(overlay, img_np[..., ::-1])
+
+    if crack_pixels == 0:
+        # Clean surface: nothing to quantify or tint, encode the image as-is
+        quant_metrics = {}
+    else:
+        # Zero-copy reinterpretation of the 1-byte bool mask as {0, 1} uint8
+        crack_mask_np = crack_mask.squeeze(0).numpy().view(np.uint8)
 
         quant_metrics = quantify_crack(
             crack_mask_np,
@@ -153,34 +505,99 @@ async def predict(file: UploadFile = File(...)):
             visualize=False,
         ) or {}
 
-        overlay = img_np.copy()
-        red = np.array([255, 0, 0], dtype=np.uint8)
-        alpha = 0.5
-        mask_indices = crack_mask_np == 1
-        overlay[mask_indices] = (
-            alpha * red + (1 - alpha) * overlay[mask_indices]
-        ).astype(np.uint8)
+        rows, cols = np.nonzero(crack_mask_np)
+        overlay[rows, cols, 0] = GB_BLEND_LUT[overlay[rows, cols, 0]]
+        overlay[rows, cols, 1] = GB_BLEND_LUT[overlay[rows, cols, 1]]
+        overlay[rows, cols, 2] = RED_BLEND_LUT[overlay[rows, cols, 2]]
+
+    # JPEG via OpenCV (libjpeg-turbo) is much faster and smaller than PNG
+    ok, buf = cv2.imencode(
+        ".jpg",
+        overlay,
+        [cv2.IMWRITE_JPEG_QUALITY, OVERLAY_JPEG_QUALITY],
+    )
+    if not ok:
+        raise RuntimeError("Failed to encode overlay image")
+    overlay_b64 = base64.b64encode(buf.tobytes()).decode("utf-8")
+
+    return {
+        "height": height,
+        "width": width,
+        "crack_coverage_pct": crack_coverage_pct,
+        "avg_confidence": avg_confidence,
+        "max_confidence": max_confidence,
+        "severity": severity,
+        "quantification": {
+            "length_mm": float(quant_metrics.get("length_mm", 0.0)),
+            "max_width_mm": float(quant_metrics.get("max_width_mm", 0.0)),
+            "mean_width_mm": float(quant_metrics.get("mean_width_mm", 0.0)),
+        },
+        "overlay_image_b64": overlay_b64,
+    }
+
+
+# LRU of postprocess() results keyed by the upload's SHA-256 digest, so re-uploads
+# of the same image (retries, UI re-runs) skip the whole pipeline. Only touched
+# from the event loop, so no locking is needed.
+_prediction_cache = OrderedDict()
+
+
+def get_cached_prediction(key: bytes):
+    result = _prediction_cache.get(key)
+    if result is not None:
+        _prediction_cache.move_to_end(key)
+    return result
+
+
+def cache_prediction(key: bytes, result: dict):
+    _prediction_cache[key] = result
+    _prediction_cache.move_to_end(key)
+    while len(_prediction_cache) > PREDICTION_CACHE_SIZE:
+        _prediction_cache.popitem(last=False)
+
+
+# --------- ROUTES ---------
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+@app.post("/predict")
+async def predict(file: UploadFile = File(...)):
+    """
+    Run UNet++ crack segmentation on the uploaded image.
 
-        pil_overlay = Image.fromarray(overlay)
-        buf = io.BytesIO()
-        pil_overlay.save(buf, format="PNG")
-        overlay_b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
+    Returns:
+        - success: bool
+        - file_name: str
+        - output_info: list (shape of the logits tensor)
+    """
+    try:
+        # 1) Read uploaded file; identical uploads are served from the cache
+        contents = await file.read()
+        cache_key = hashlib.sha256(contents).digest()
+        result = get_cached_prediction(cache_key)
+
+        if result is None:
+            # Backpressure: the stage executors' queues are unbounded, so cap
+            # how many decoded images / logits can be pending at once
+            async with pipeline_slots:
+                # 2) Decode + preprocess to tensor [1, 3, 512, 512] off the event loop
+                loop = asyncio.get_running_loop()
+                img_np, tensor = await loop.run_in_executor(preprocess_pool, preprocess, contents)
+
+                # 3) Inference (batched with other in-flight requests)
+                logits = await batcher.infer(tensor)  # [1, NUM_CLASSES, H, W]
+
+                # 4) Statistics, quantification and overlay
+                result = await loop.run_in_executor(postprocess_pool, postprocess, img_np, logits)
+            cache_prediction(cache_key, result)
 
         return {
             "success": True,
             "file_name": file.filename,
-            "height": height,
-            "width": width,
-            "crack_coverage_pct": crack_coverage_pct,
-            "avg_confidence": avg_confidence,
-            "max_confidence": max_confidence,
-            "severity": severity,
-            "quantification": {
-                "length_mm": float(quant_metrics.get("length_mm", 0.0)),
-                "max_width_mm": float(quant_metrics.get("max_width_mm", 0.0)),
-                "mean_width_mm": float(quant_metrics.get("mean_width_mm", 0.0)),
-            },
-            "overlay_image_b64": overlay_b64,
+            **result,
         }
 
     except Exception as e:
@@ -0,0 +1,37 @@
+"""INT8 post-training quantization of the exported ONNX crack model."""
+
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    QuantFormat,
+    QuantType,
+    quantize_static,
+)
+
+
+class _CalibrationReader(CalibrationDataReader):
+    """Feeds preprocessed calibration images to the ONNX Runtime quantizer."""
+
+    def __init__(self, inputs, input_name: str = "x"):
+        self._batches = iter([{input_name: x} for x in inputs])
+
+    def get_next(self):
+        return next(self._batches, None)
+
+
+def quantize_int8(onnx_path, output_path, calibration_inputs):
+    """
+    Post-training static INT8 quantization of the exported ONNX model.
+    calibration_inputs: float32 arrays of shape [1, 3, H, W], preprocessed
+    exactly as at inference time (a handful of crack images is enough).
+    Weights are quantized per-channel to int8, activations to uint8 (QDQ).
+    """
+    quantize_static(
+        str(onnx_path),
+        str(output_path),
+        _CalibrationReader(calibration_inputs),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+    return output_path
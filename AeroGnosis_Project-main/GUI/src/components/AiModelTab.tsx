@@ -123,7 +123,7 @@ export function AiModelTab({ selectedFile, onRun, isLoading, error, result }: Ai
             <div>
               <h4 className="text-sm font-medium mb-2 text-white">Crack Segmentation Overlay</h4>
               <img
-                src={`data:image/png;base64,${result.overlay_image_b64}`}
+                src={`data:image/jpeg;base64,${result.overlay_image_b64}`}
                 alt="Model overlay"
                 className="rounded-md border border-border max-h-96 object-contain w-full"
               />